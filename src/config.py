@@ -1,6 +1,7 @@
 DEBUG = False
 VERSION = '1.4.2'
 GROUP_BY_MINUTES = 10
+MAX_TRACE_POINTS = 2000
 OUTPUT_DIR_PATH = None
 project_id = None
 region = None
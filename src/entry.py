@@ -9,6 +9,7 @@ from figure_logic.general_related import *
 from figure_logic.transaction_related import *
 from metrics import CloudSQLMetrics
 from hotspots_report import HotspotsReport
+from utils import clear_ts_cache
 import config as config
 
 from g_monitoring_collector import GMonitoringCollector
@@ -48,111 +49,115 @@ def analysis_entry(project_id, instance_id, output_dir, start_time, end_time, du
         },
     )
 
-    # --- Start Analysis ---
-
-    report.add_figures([
-        {
-            "category": "General",
-            "title": "Database History",
-            "figure_html": HotspotsReport.plotly_fragment(general_database_overview(metrics)),
-            "notes": ["High CPU Usage is normal and acceptable as the database might parallel tasks for efficiency.",
-                      "If High CPU Usage is suspicious, comparing the period with IO performance/waiting time/Savepoints, etc, are recommended."],
-        },
-        {
-            "category": "SQL",
-            "title": "SQL with Most Latency Time",
-            "figure_html": HotspotsReport.plotly_fragment(sql_perquery_latency_metrics(metrics)),
-            "notes": ["[[Top Latency SQL Output|top_latency_sql.txt]]",
-                      "top_latency_sql.txt",
-                      "One commit should <= 10 ms"],
-        },
-        {
-            "category": "SQL",
-            "title": "SQL with Most IO Wait Time(Meta)",
-            "figure_html": HotspotsReport.plotly_fragment(sql_perquery_io_time_metrics(metrics)),
-            "notes": ["Often the symptom from another long-running SQL query holding the lock"],
-        },
-        {
-            "category": "SQL",
-            "title": "SQL with Most Lock Wait Time(Meta)",
-            "figure_html": HotspotsReport.plotly_fragment(sql_perquery_lock_time_metrics(metrics)),
-            "notes": ["Often the symptom from another long-running SQL query holding the lock",
-                      "In Case of CPU starvation, check whether it is a CPU saturation scenario"],
-        },
-        # {
-        #     "category": "Disk",
-        #     "title": "Disk Overview(Meta)",
-        #     "figure_html": HotspotsReport.plotly_fragment(disk_overview(metrics)),
-        #     "notes": ["No Note at this stage"],
-        # },
-        {
-            "category": "Disk",
-            "title": "Disk Read/Write Count",
-            "figure_html": HotspotsReport.plotly_fragment(disk_ops(metrics)),
-            "notes": ["No Note at this stage"],
-        },
-        {
-            "category": "Transaction",
-            "title": "Transaction Ops Count",
-            "figure_html": HotspotsReport.plotly_fragment(transaction_ops(metrics)),
-            "notes": ["No Note at this stage"],
-        },
-        {
-            "category": "Transaction",
-            "title": "Statements Executed Count",
-            "figure_html": HotspotsReport.plotly_fragment(statements_executed_count(metrics)),
-            "notes": ["Utility is a category for all queries that is not define as SELECT, UPDATE, INSERT or DELETE. For instance, CREAT, DROP, etc. This is not an issue to avoid."],
-        },
-        {
-            "category": "Network",
-            "title": "Network Overview",
-            "figure_html": HotspotsReport.plotly_fragment(network_overview(metrics)),
-            "notes": ["No Note at this stage"],
-        },
-        {
-            "category": "WAL",
-            "title": "WAL History(Beta)",
-            "figure_html": HotspotsReport.plotly_fragment(wal_overview(metrics)),
-            "notes": ["No Note at this stage"],
-        },
-    ])
-
-    # report.add_figures([
-    #     {
-    #         "category": "CPU",
-    #         "title": "CPU Usage",
-    #         "figure_html": HotspotsReport.plotly_fragment(export_cloudsql_cpu_plot_html(metrics)),
-    #         "notes": ["High CPU Usage is normal and acceptable as the database might parallel tasks for efficiency.",
-    #                   "If High CPU Usage is suspicious, comparing the period with IO performance/waiting time/Savepoints, etc, are recommended."],
-    #     },
-    #     {
-    #         "category": "SQL",
-    #         "title": "SQL consumption Overview",
-    #         "figure_html": HotspotsReport.plotly_fragment(sql_consumption_overview(metrics)),
-    #         "notes": ["Average Execution time under 10 ms is healthy", "Above 20ms should be investigated; 100ms indicates something goes wrong"],
-    #     },
-    #     {
-    #         "category": "SQL",
-    #         "title": "WAL-heavy queries",
-    #         "figure_html": HotspotsReport.plotly_fragment(sql_wal_heavy_job(metrics)),
-    #         "notes": ["Filtered to top 20 statements.", "CPU sampled every 5 seconds."],
-    #     },
-    #     {
-    #         "category": "Disk",
-    #         "title": "Cloud SQL Disk Usage",
-    #         "figure_html": HotspotsReport.plotly_fragment(disk_usage_pie_overview(metrics)),
-    #         "notes": ["Filtered to top 20 statements.", "CPU sampled every 5 seconds."],
-    #     },
-    #     {
-    #         "category": "Disk",
-    #         "title": "Cloud SQL Disk Usage & IO Overview",
-    #         "figure_html": HotspotsReport.plotly_fragment(disk_io_and_usage_timeseries(metrics)),
-    #         "notes": ["Filtered to top 20 statements.", "CPU sampled every 5 seconds."],
-    #     },
-    #
-    # ])
-
-    report.render(f"report_{start_time.strftime(time_fmt)}_{end_time.strftime(time_fmt)}.html")
+    # ts_xy memoizes series for this run; release them even if a builder fails
+    try:
+        # --- Start Analysis ---
+
+        report.add_figures([
+            {
+                "category": "General",
+                "title": "Database History",
+                "figure_html": HotspotsReport.plotly_fragment(general_database_overview(metrics)),
+                "notes": ["High CPU Usage is normal and acceptable as the database might parallel tasks for efficiency.",
+                          "If High CPU Usage is suspicious, comparing the period with IO performance/waiting time/Savepoints, etc, are recommended."],
+            },
+            {
+                "category": "SQL",
+                "title": "SQL with Most Latency Time",
+                "figure_html": HotspotsReport.plotly_fragment(sql_perquery_latency_metrics(metrics)),
+                "notes": ["[[Top Latency SQL Output|top_latency_sql.txt]]",
+                          "top_latency_sql.txt",
+                          "One commit should <= 10 ms"],
+            },
+            {
+                "category": "SQL",
+                "title": "SQL with Most IO Wait Time(Meta)",
+                "figure_html": HotspotsReport.plotly_fragment(sql_perquery_io_time_metrics(metrics)),
+                "notes": ["Often the symptom from another long-running SQL query holding the lock"],
+            },
+            {
+                "category": "SQL",
+                "title": "SQL with Most Lock Wait Time(Meta)",
+                "figure_html": HotspotsReport.plotly_fragment(sql_perquery_lock_time_metrics(metrics)),
+                "notes": ["Often the symptom from another long-running SQL query holding the lock",
+                          "In Case of CPU starvation, check whether it is a CPU saturation scenario"],
+            },
+            # {
+            #     "category": "Disk",
+            #     "title": "Disk Overview(Meta)",
+            #     "figure_html": HotspotsReport.plotly_fragment(disk_overview(metrics)),
+            #     "notes": ["No Note at this stage"],
+            # },
+            {
+                "category": "Disk",
+                "title": "Disk Read/Write Count",
+                "figure_html": HotspotsReport.plotly_fragment(disk_ops(metrics)),
+                "notes": ["No Note at this stage"],
+            },
+            {
+                "category": "Transaction",
+                "title": "Transaction Ops Count",
+                "figure_html": HotspotsReport.plotly_fragment(transaction_ops(metrics)),
+                "notes": ["No Note at this stage"],
+            },
+            {
+                "category": "Transaction",
+                "title": "Statements Executed Count",
+                "figure_html": HotspotsReport.plotly_fragment(statements_executed_count(metrics)),
+                "notes": ["Utility is a category for all queries that is not define as SELECT, UPDATE, INSERT or DELETE. For instance, CREAT, DROP, etc. This is not an issue to avoid."],
+            },
+            {
+                "category": "Network",
+                "title": "Network Overview",
+                "figure_html": HotspotsReport.plotly_fragment(network_overview(metrics)),
+                "notes": ["No Note at this stage"],
+            },
+            {
+                "category": "WAL",
+                "title": "WAL History(Beta)",
+                "figure_html": HotspotsReport.plotly_fragment(wal_overview(metrics)),
+                "notes": ["No Note at this stage"],
+            },
+        ])
+
+        # report.add_figures([
+        #     {
+        #         "category": "CPU",
+        #         "title": "CPU Usage",
+        #         "figure_html": HotspotsReport.plotly_fragment(export_cloudsql_cpu_plot_html(metrics)),
+        #         "notes": ["High CPU Usage is normal and acceptable as the database might parallel tasks for efficiency.",
+        #                   "If High CPU Usage is suspicious, comparing the period with IO performance/waiting time/Savepoints, etc, are recommended."],
+        #     },
+        #     {
+        #         "category": "SQL",
+        #         "title": "SQL consumption Overview",
+        #         "figure_html": HotspotsReport.plotly_fragment(sql_consumption_overview(metrics)),
+        #         "notes": ["Average Execution time under 10 ms is healthy", "Above 20ms should be investigated; 100ms indicates something goes wrong"],
+        #     },
+        #     {
+        #         "category": "SQL",
+        #         "title": "WAL-heavy queries",
+        #         "figure_html": HotspotsReport.plotly_fragment(sql_wal_heavy_job(metrics)),
+        #         "notes": ["Filtered to top 20 statements.", "CPU sampled every 5 seconds."],
+        #     },
+        #     {
+        #         "category": "Disk",
+        #         "title": "Cloud SQL Disk Usage",
+        #         "figure_html": HotspotsReport.plotly_fragment(disk_usage_pie_overview(metrics)),
+        #         "notes": ["Filtered to top 20 statements.", "CPU sampled every 5 seconds."],
+        #     },
+        #     {
+        #         "category": "Disk",
+        #         "title": "Cloud SQL Disk Usage & IO Overview",
+        #         "figure_html": HotspotsReport.plotly_fragment(disk_io_and_usage_timeseries(metrics)),
+        #         "notes": ["Filtered to top 20 statements.", "CPU sampled every 5 seconds."],
+        #     },
+        #
+        # ])
+
+        report.render(f"report_{start_time.strftime(time_fmt)}_{end_time.strftime(time_fmt)}.html")
+    finally:
+        clear_ts_cache()
     print("Wrote postgres_hotspots_report.html (offline, single file).")
 
 
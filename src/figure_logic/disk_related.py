@@ -3,24 +3,19 @@ from __future__ import annotations
 from datetime import datetime
 from typing import Dict, List, Optional, Tuple
 
+import numpy as np
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 
 from metrics import CloudSQLMetrics
-from utils import bytes_to_unit, get_disk_iops_tp
+from utils import bytes_to_gib, bytes_to_unit_array, downsample_stacked, downsample_xy, get_disk_iops_tp, ts_xy
 
 
 
-def _safe_xy(ts) -> Tuple[List[datetime], List[float]]:
+def _safe_xy(ts) -> Tuple[List[datetime], np.ndarray]:
     """Return (x, y) sorted by time from a TimeSeries-like object."""
     try:
-        vals = list(ts.values)  # List[(datetime, value)]
-        if not vals:
-            return [], []
-        vals.sort(key=lambda x: x[0])
-        x = [t for t, _ in vals]
-        y = [float(v) for _, v in vals]
-        return x, y
+        return ts_xy(ts)
     except Exception:
         return [], []
 
@@ -47,13 +42,20 @@ def disk_overview(metrics: CloudSQLMetrics) -> go.Figure:
     )
 
     # --- Figure I: Disk Space Usage---
-    x_ts = metrics.disk_utilization.timestamps()
+    x_ts, _ = ts_xy(metrics.disk_utilization)
+    _, quota_data = ts_xy(metrics.disk_quota)
 
-    for d_type, values in metrics.disk_bytes_used_by_type.items():
+    by_type = []
+    for values in metrics.disk_bytes_used_by_type.values():
+        x_type, y_type = ts_xy(values)
+        by_type.append((x_type, bytes_to_unit_array(y_type, dtype=np.float32)))
+
+    # Layers are downsampled together so the stacked total keeps its peaks
+    for d_type, (x_type, y_type) in zip(metrics.disk_bytes_used_by_type, downsample_stacked(by_type)):
         fig.add_trace(
             go.Scatter(
-                x=values.timestamps(),
-                y=[bytes_to_unit(v) for v in values.data()],
+                x=x_type,
+                y=y_type,
                 name=d_type,
                 mode="lines",
                 # line=dict(color=CONNECTION_STATE_COLORS[state]),
@@ -63,14 +65,16 @@ def disk_overview(metrics: CloudSQLMetrics) -> go.Figure:
                 ),
                 showlegend=False,
                 visible=True,
+                _validate=False,
             ),
             row=1, col=1,
         )
 
+    x_quota, y_quota = downsample_xy(x_ts, bytes_to_unit_array(quota_data, dtype=np.float32))
     fig.add_trace(
         go.Scatter(
-            x=x_ts,
-            y=[bytes_to_unit(v) for v in metrics.disk_quota.data()],
+            x=x_quota,
+            y=y_quota,
             mode="lines",
             line=dict(
                 color="lightcoral",
@@ -85,28 +89,30 @@ def disk_overview(metrics: CloudSQLMetrics) -> go.Figure:
             )
             ,
             showlegend=False,
+            _validate=False,
         ),
         secondary_y=False,
         row=1, col=1
     )
 
-    fig.add_annotation(
-        x=x_ts[-15],
-        y=bytes_to_unit(metrics.disk_quota.data()[-1]),
-        text="Quota",
-        showarrow=False,
-        font=dict(
-            color="white",
-            size=12,
-        ),
-        bgcolor="lightcoral",  # 填滿背景
-        bordercolor="lightcoral",  # 邊框顏色
-        borderwidth=0.5,  # 邊框粗細
-        borderpad=1,  # 文字與框的內距
-        xanchor="left",
-        yanchor="bottom",
-        row=1,col=1,
-    )
+    if x_ts and len(quota_data):
+        fig.add_annotation(
+            x=x_ts[-min(15, len(x_ts))],
+            y=bytes_to_gib(quota_data[-1]),
+            text="Quota",
+            showarrow=False,
+            font=dict(
+                color="white",
+                size=12,
+            ),
+            bgcolor="lightcoral",  # 填滿背景
+            bordercolor="lightcoral",  # 邊框顏色
+            borderwidth=0.5,  # 邊框粗細
+            borderpad=1,  # 文字與框的內距
+            xanchor="left",
+            yanchor="bottom",
+            row=1,col=1,
+        )
 
     # --- Figure II: Disk IOPs---
 
@@ -167,21 +173,25 @@ def disk_overview(metrics: CloudSQLMetrics) -> go.Figure:
     return fig
 
 def disk_ops(metrics: CloudSQLMetrics) -> go.Figure:
-    fig = go.Figure()
+    fig = go.Figure(_validate=False)
 
     tier = metrics.instance_details["tier"]
     availability = metrics.instance_details["availability"]
     disk_iops_tp = get_disk_iops_tp(tier, availability)
     read_iops, write_iops = disk_iops_tp["max_iops_rw"]
     read_iops, write_iops = read_iops*60, write_iops*60
-    x_ts = metrics.disk_write_ops.timestamps()
+    x_ts, y_write_ops = ts_xy(metrics.disk_write_ops)
+    x_read, y_read_ops = ts_xy(metrics.disk_read_ops)
+    # Each series keeps its own peak timestamps, so read and write get separate x
+    x_read_plot, y_read_plot = downsample_xy(x_read, y_read_ops.astype(np.float32))
+    x_write_plot, y_write_plot = downsample_xy(x_ts, y_write_ops.astype(np.float32))
 
 
 
     fig.add_trace(
             go.Scatter(
-                x=x_ts,
-                y=metrics.disk_read_ops.data(),
+                x=x_read_plot,
+                y=y_read_plot,
                 name="read_ops",
                 mode="lines",
                 line=dict(color="lightblue"),
@@ -190,13 +200,14 @@ def disk_ops(metrics: CloudSQLMetrics) -> go.Figure:
                 ),
                 showlegend=False,
                 visible=True,
+                _validate=False,
             ),
         )
 
     fig.add_trace(
             go.Scatter(
-                x=x_ts,
-                y=metrics.disk_write_ops.data(),
+                x=x_write_plot,
+                y=y_write_plot,
                 name="write_ops",
                 mode="lines",
                 line=dict(color="lightcoral"),
@@ -205,12 +216,13 @@ def disk_ops(metrics: CloudSQLMetrics) -> go.Figure:
                 ),
                 showlegend=False,
                 visible=True,
+                _validate=False,
             ),
         )
     fig.add_trace(
         go.Scatter(
-            x=x_ts,
-            y=[read_iops] * len(x_ts),
+            x=x_write_plot,
+            y=np.full(len(x_write_plot), read_iops, dtype=np.float32),
             mode="lines",
             line=dict(
                 color="blue",
@@ -222,12 +234,13 @@ def disk_ops(metrics: CloudSQLMetrics) -> go.Figure:
             )
             ,
             showlegend=False,
+            _validate=False,
         ),
     )
     fig.add_trace(
         go.Scatter(
-            x=x_ts,
-            y=[write_iops] * len(x_ts),
+            x=x_write_plot,
+            y=np.full(len(x_write_plot), write_iops, dtype=np.float32),
             mode="lines",
             line=dict(
                 color="red",
@@ -242,41 +255,43 @@ def disk_ops(metrics: CloudSQLMetrics) -> go.Figure:
             )
             ,
             showlegend=False,
+            _validate=False,
         ),
     )
     # --- formatting ---
-    fig.add_annotation(
-        x=x_ts[-30],
-        y=read_iops,
-        text="Read max",
-        showarrow=False,
-        font=dict(
-            color="white",
-            size=12,
-        ),
-        bgcolor="blue",  # 填滿背景
-        bordercolor="blue",  # 邊框顏色
-        borderwidth=0.5,  # 邊框粗細
-        borderpad=1,  # 文字與框的內距
-        xanchor="left",
-        yanchor="bottom",
-    )
-    fig.add_annotation(
-        x=x_ts[-15],
-        y=write_iops,
-        text="Write max",
-        showarrow=False,
-        font=dict(
-            color="white",
-            size=12,
-        ),
-        bgcolor="red",  # 填滿背景
-        bordercolor="red",  # 邊框顏色
-        borderwidth=0.5,  # 邊框粗細
-        borderpad=1,  # 文字與框的內距
-        xanchor="left",
-        yanchor="bottom",
-    )
+    if x_ts:
+        fig.add_annotation(
+            x=x_ts[-min(30, len(x_ts))],
+            y=read_iops,
+            text="Read max",
+            showarrow=False,
+            font=dict(
+                color="white",
+                size=12,
+            ),
+            bgcolor="blue",  # 填滿背景
+            bordercolor="blue",  # 邊框顏色
+            borderwidth=0.5,  # 邊框粗細
+            borderpad=1,  # 文字與框的內距
+            xanchor="left",
+            yanchor="bottom",
+        )
+        fig.add_annotation(
+            x=x_ts[-min(15, len(x_ts))],
+            y=write_iops,
+            text="Write max",
+            showarrow=False,
+            font=dict(
+                color="white",
+                size=12,
+            ),
+            bgcolor="red",  # 填滿背景
+            bordercolor="red",  # 邊框顏色
+            borderwidth=0.5,  # 邊框粗細
+            borderpad=1,  # 文字與框的內距
+            xanchor="left",
+            yanchor="bottom",
+        )
     fig.update_xaxes(
         tickformat="%H:%M<br>%Y/%m/%d<br>%a",
     )
@@ -307,25 +322,26 @@ def disk_usage_pie_overview(
       - Legend shown on the RIGHT side
       - Toggleable 90% quota warning line
     """
-    cur_quota = metrics.disk_quota.data()[-1]
-    cur_used = metrics.disk_bytes_used.data()[-1]
+    quota_x, quota_data = ts_xy(metrics.disk_quota)
+    used_x, used_data = ts_xy(metrics.disk_bytes_used)
+    by_type_xy = {
+        k: ts_xy(ts)
+        for k, ts in metrics.disk_bytes_used_by_type.items()
+    }
+
+    cur_quota = quota_data[-1]
+    cur_used = used_data[-1]
     cur_avail_bytes = max(cur_quota - cur_used, 0.0)
 
     by_type_b: Dict[str, float] = {}
-    for k, ts in metrics.disk_bytes_used_by_type.items():
-        cur_used_k_bytes = ts.data()[-1]
+    for k, (_, data) in by_type_xy.items():
+        cur_used_k_bytes = data[-1]
         if cur_used_k_bytes is not None and cur_used_k_bytes >= 0:
             by_type_b[k] = cur_used_k_bytes
 
-    labels: List[str] = []
-    values: List[float] = []
-
-    for item in sorted(by_type_b.items(), key=lambda x: x[1]):
-        labels.append(item[0])
-        values.append(bytes_to_unit(item[1]))
-
-    labels.append("Available")
-    values.append(bytes_to_unit(cur_avail_bytes))
+    sorted_by_type = sorted(by_type_b.items(), key=lambda x: x[1])
+    labels: List[str] = [k for k, _ in sorted_by_type] + ["Available"]
+    values = bytes_to_unit_array([b for _, b in sorted_by_type] + [cur_avail_bytes])
 
 
     fig = make_subplots(
@@ -351,6 +367,7 @@ def disk_usage_pie_overview(
             insidetextorientation="radial",
             hovertemplate="<b>%{label}</b><br>%{value:.2f} GiB<extra></extra>",
             showlegend=False,
+            _validate=False,
         ),
         row=1,
         col=1,
@@ -359,15 +376,16 @@ def disk_usage_pie_overview(
     # -------------------
     # RIGHT: Time series (legend ON)
     # -------------------
-    x_used = metrics.disk_quota.timestamps()
-    y_used = metrics.disk_quota.data()
+    quota_gib = bytes_to_unit_array(quota_data, dtype=np.float32)
+    x_plot, y_plot = downsample_xy(quota_x, quota_gib)
     fig.add_trace(
         go.Scatter(
-            x=x_used,
-            y=[bytes_to_unit(v) for v in y_used],
+            x=x_plot,
+            y=y_plot,
             mode="lines",
             name="quota",
             hovertemplate="%{x}<br>%{y:.2f} GiB<extra></extra>",
+            _validate=False,
         ),
         row=1,
         col=2,
@@ -376,28 +394,30 @@ def disk_usage_pie_overview(
 
 
 
-    x_used = metrics.disk_bytes_used.timestamps()
-    y_used = metrics.disk_bytes_used.data()
+    x_plot, y_plot = downsample_xy(used_x, bytes_to_unit_array(used_data, dtype=np.float32))
     fig.add_trace(
         go.Scatter(
-            x=x_used,
-            y=[bytes_to_unit(v) for v in y_used],
+            x=x_plot,
+            y=y_plot,
             mode="lines",
             name="disk_bytes_used",
             hovertemplate="%{x}<br>%{y:.2f} GiB<extra></extra>",
+            _validate=False,
         ),
         row=1,
         col=2,
     )
 
-    for type_name, ts in metrics.disk_bytes_used_by_type.items():
+    for type_name, (type_x, type_data) in by_type_xy.items():
+        x_plot, y_plot = downsample_xy(type_x, bytes_to_unit_array(type_data, dtype=np.float32))
         fig.add_trace(
             go.Scatter(
-                x=ts.timestamps(),
-                y=[bytes_to_unit(v) for v in ts.data()],
+                x=x_plot,
+                y=y_plot,
                 mode="lines",
                 name=f"Type: {type_name}",
                 hovertemplate="%{x}<br>%{y:.2f} GiB<extra></extra>",
+                _validate=False,
             ),
             row=1,
             col=2,
@@ -406,8 +426,7 @@ def disk_usage_pie_overview(
     # -------------------
     # Warning line + toggle
     # -------------------
-    warn_x = metrics.disk_quota.timestamps()
-    warn_y = [bytes_to_unit(v* 0.9)  for v in metrics.disk_quota.data()]  # 90% in GiB
+    warn_x, warn_y = downsample_xy(quota_x, quota_gib * 0.9)  # 90% in GiB
 
     fig.add_trace(
         go.Scatter(
@@ -418,6 +437,7 @@ def disk_usage_pie_overview(
             line=dict(color="red", dash="dash"),
             visible=False,
             hovertemplate="%{x}<br>%{y:.2f} GiB (90% quota)<extra></extra>",
+            _validate=False,
         ),
         row=1,
         col=2,
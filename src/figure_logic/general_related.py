@@ -5,9 +5,11 @@ from pathlib import Path
 from datetime import datetime
 from typing import Optional, Dict
 
-from utils import bytes_to_unit
+from utils import bytes_to_gib, bytes_to_unit_array
 import config as config
 
+import numpy as np
+
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 
@@ -78,12 +80,13 @@ def general_database_overview(metrics: CloudSQLMetrics) -> go.Figure:
     )
     # --- Figure II: Disk ---
     x_ts = metrics.disk_utilization.timestamps()
+    disk_quota_data = metrics.disk_quota.data()
 
     for d_type, values in metrics.disk_bytes_used_by_type.items():
         fig.add_trace(
             go.Scatter(
                 x=values.timestamps(),
-                y=[bytes_to_unit(v) for v in values.data()],
+                y=bytes_to_unit_array(values.data()),
                 name=d_type,
                 mode="lines",
                 # line=dict(color=CONNECTION_STATE_COLORS[state]),
@@ -100,7 +103,7 @@ def general_database_overview(metrics: CloudSQLMetrics) -> go.Figure:
     fig.add_trace(
         go.Scatter(
             x=x_ts,
-            y=[bytes_to_unit(v) for v in metrics.disk_quota.data()],
+            y=bytes_to_unit_array(disk_quota_data),
             mode="lines",
             line=dict(
                 color="lightcoral",
@@ -120,34 +123,39 @@ def general_database_overview(metrics: CloudSQLMetrics) -> go.Figure:
         row=2, col=1
     )
 
-    fig.add_annotation(
-        x=x_ts[-15],
-        y=bytes_to_unit(metrics.disk_quota.data()[-1]),
-        text="Quota",
-        showarrow=False,
-        font=dict(
-            color="white",
-            size=12,
-        ),
-        bgcolor="lightcoral",  # 填滿背景
-        bordercolor="lightcoral",  # 邊框顏色
-        borderwidth=0.5,  # 邊框粗細
-        borderpad=1,  # 文字與框的內距
-        xanchor="left",
-        yanchor="bottom",
-        row=2,col=1,
-    )
+    if x_ts and disk_quota_data:
+        fig.add_annotation(
+            x=x_ts[-min(15, len(x_ts))],
+            y=bytes_to_gib(disk_quota_data[-1]),
+            text="Quota",
+            showarrow=False,
+            font=dict(
+                color="white",
+                size=12,
+            ),
+            bgcolor="lightcoral",  # 填滿背景
+            bordercolor="lightcoral",  # 邊框顏色
+            borderwidth=0.5,  # 邊框粗細
+            borderpad=1,  # 文字與框的內距
+            xanchor="left",
+            yanchor="bottom",
+            row=2,col=1,
+        )
 
     # --- Figure III: Memory ---
     x_memory = metrics.memory_quota.timestamps()
+    memory_quota_data = metrics.memory_quota.data()
+    memory_quota_gib = bytes_to_unit_array(memory_quota_data)
     for component_type, values in metrics.memory_components.items():
         if component_type == "Free":
             continue
-        bytes_values = [a * b / 100 for a, b in zip(values.data(), metrics.memory_quota.data())]
+        # Components are reported as a percentage of the quota
+        pct = np.nan_to_num(np.array(values.data(), dtype=np.float64))
+        n = min(pct.size, memory_quota_gib.size)
         fig.add_trace(
                 go.Scatter(
                     x=x_memory,
-                    y=[bytes_to_unit(v) for v in bytes_values],
+                    y=pct[:n] * memory_quota_gib[:n] / 100,
                     name=component_type,
                     mode="lines",
                     # line=dict(color=CONNECTION_STATE_COLORS[state]),
@@ -164,7 +172,7 @@ def general_database_overview(metrics: CloudSQLMetrics) -> go.Figure:
     fig.add_trace(
         go.Scatter(
             x=x_memory,
-            y=[bytes_to_unit(v) for v in metrics.memory_quota.data()],
+            y=memory_quota_gib,
             mode="lines",
             line=dict(
                 color="lightcoral",
@@ -184,23 +192,24 @@ def general_database_overview(metrics: CloudSQLMetrics) -> go.Figure:
         row=3, col=1
     )
 
-    fig.add_annotation(
-        x=x_memory[-15],
-        y=bytes_to_unit(metrics.memory_quota.data()[-1]),
-        text="Quota",
-        showarrow=False,
-        font=dict(
-            color="white",
-            size=12,
-        ),
-        bgcolor="lightcoral",  # 填滿背景
-        bordercolor="lightcoral",  # 邊框顏色
-        borderwidth=0.5,  # 邊框粗細
-        borderpad=1,  # 文字與框的內距
-        xanchor="left",
-        yanchor="bottom",
-        row=3,col=1,
-    )
+    if x_memory and memory_quota_data:
+        fig.add_annotation(
+            x=x_memory[-min(15, len(x_memory))],
+            y=bytes_to_gib(memory_quota_data[-1]),
+            text="Quota",
+            showarrow=False,
+            font=dict(
+                color="white",
+                size=12,
+            ),
+            bgcolor="lightcoral",  # 填滿背景
+            bordercolor="lightcoral",  # 邊框顏色
+            borderwidth=0.5,  # 邊框粗細
+            borderpad=1,  # 文字與框的內距
+            xanchor="left",
+            yanchor="bottom",
+            row=3,col=1,
+        )
     # --- Formatting ---
     fig.update_xaxes(
         showticklabels=False,
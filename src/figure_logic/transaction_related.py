@@ -3,90 +3,101 @@ from __future__ import annotations
 from datetime import datetime
 from typing import Dict, List, Optional, Tuple
 
+import numpy as np
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 
 from metrics import CloudSQLMetrics, PSQLStatementsExecutedCountMetric
+from utils import downsample_stacked, downsample_xy, ts_xy
+
+# The first trace carries the time header for the shared hover box
+_HOVER_FIRST = (
+    "<b>Time:</b> %{x|%H:%M} - "
+    "%{x|%Y/%m/%d} - "
+    "%{x|%a}<br><br>"
+    "<b>Counts:</b> %{y}<br>"
+)
+_HOVER_REST = "<b>Counts:</b> %{y}<br>"
 
 
 def transaction_ops(metrics: CloudSQLMetrics) -> go.Figure:
-    fig = go.Figure()
+    fig = go.Figure(_validate=False)
 
-    x_avg = []
-    avg_sum: int = 0
+    x_avg: Optional[List[datetime]] = None
+    avg_sum: float = 0.0
     avg_count: int = 0
 
-    first_trace = True
+    names: List[str] = []
+    stacked: List[Tuple[List[datetime], np.ndarray]] = []
     for item in  metrics.psql_transaction_count:
-        if sum(item.psql_transaction_count.data()) < 5:
+        x_item, counts = ts_xy(item.psql_transaction_count)
+        total = counts.sum()
+        if total < 5:
             continue
 
-        x_avg = item.psql_transaction_count.timestamps() if x_avg == [] else x_avg
-        avg_sum += sum(item.psql_transaction_count.data())
-        avg_count = len(item.psql_transaction_count.data()) if avg_count == 0 else avg_count
+        if x_avg is None:
+            # The average line follows the first series kept
+            x_avg = x_item
+            avg_count = counts.size
+        avg_sum += total
 
-        if first_trace:
-            hovertemplate = (
-                "<b>Time:</b> %{x|%H:%M} - "
-                "%{x|%Y/%m/%d} - "
-                "%{x|%a}<br><br>"
-                "<b>Counts:</b> %{y}<br>"
-            )
-            first_trace = False
-        else:
-            hovertemplate = (
-                        "<b>Counts:</b> %{y}<br>"
-                    )
+        names.append(item.database + "(" + item.transaction_type + ")")
+        stacked.append((x_item, counts.astype(np.float32)))
 
-        unique_id = item.database + "(" + item.transaction_type + ")"
+    # Layers are downsampled together so the stacked total keeps its peaks
+    for i, (unique_id, (x_plot, y_plot)) in enumerate(zip(names, downsample_stacked(stacked))):
         fig.add_trace(
             go.Scatter(
-                x=item.psql_transaction_count.timestamps(),
-                y=item.psql_transaction_count.data(),
+                x=x_plot,
+                y=y_plot,
                 name=unique_id,
                 mode="lines",
                 # line=dict(color=CONNECTION_STATE_COLORS[item.state]),
                 stackgroup="one",
                 legendgroup=unique_id,
-                hovertemplate=hovertemplate,
+                hovertemplate=_HOVER_FIRST if i == 0 else _HOVER_REST,
                 showlegend=True,
                 visible=True,
+                _validate=False,
             ),
         )
 
-    avg_values = [round(avg_sum / avg_count)] * len(x_avg)
-
-    fig.add_trace(
-        go.Scatter(
-            x=x_avg,
-            y=avg_values,
-            name="AVG Count",
-            mode="lines",
-            line=dict(
-                color="lightcoral",
-                dash="dash",
-                width=2
+    if x_avg:
+        avg_values = np.full(len(x_avg), round(avg_sum / avg_count), dtype=np.float32)
+        x_avg_plot, y_avg_plot = downsample_xy(x_avg, avg_values)
+
+        fig.add_trace(
+            go.Scatter(
+                x=x_avg_plot,
+                y=y_avg_plot,
+                name="AVG Count",
+                mode="lines",
+                line=dict(
+                    color="lightcoral",
+                    dash="dash",
+                    width=2
+                ),
+                hovertemplate="<b>Avg. Counts:</b>  %{y}<br>",
+                showlegend=True,
+                _validate=False,
+            )
+        )
+        fig.add_annotation(
+            x=x_avg[-min(15, len(x_avg))],
+            y=avg_values[-1],
+            text="Avg. Count",
+            showarrow=False,
+            font=dict(
+                color="white",
+                size=12,
             ),
-            hovertemplate="<b>Avg. Counts:</b>  %{y}<br>",
-            showlegend=True,
+            bgcolor="lightcoral",  # 填滿背景
+            bordercolor="lightcoral",  # 邊框顏色
+            borderwidth=0.5,  # 邊框粗細
+            borderpad=1,  # 文字與框的內距
+            xanchor="left",
+            yanchor="bottom",
         )
-    )
-    fig.add_annotation(
-        x=x_avg[-15],
-        y=avg_values[-1],
-        text="Avg. Count",
-        showarrow=False,
-        font=dict(
-            color="white",
-            size=12,
-        ),
-        bgcolor="lightcoral",  # 填滿背景
-        bordercolor="lightcoral",  # 邊框顏色
-        borderwidth=0.5,  # 邊框粗細
-        borderpad=1,  # 文字與框的內距
-        xanchor="left",
-        yanchor="bottom",
-    )
 
     fig.update_xaxes(
         tickformat="%H:%M<br>%Y/%m/%d<br>%a",
@@ -114,62 +125,56 @@ def transaction_ops(metrics: CloudSQLMetrics) -> go.Figure:
 
 
 def statements_executed_count(metrics: CloudSQLMetrics) -> go.Figure:
-    fig = go.Figure()
+    fig = go.Figure(_validate=False)
 
-    first_trace = True
+    names: List[str] = []
+    stacked: List[Tuple[List[datetime], np.ndarray]] = []
     for item in  metrics.psql_statements_executed_count_metrics:
-        if sum(item.psql_statements_executed_count.data()) < 5:
+        x_item, counts = ts_xy(item.psql_statements_executed_count)
+        if counts.sum() < 5:
             continue
 
-        if first_trace:
-            hovertemplate = (
-                "<b>Time:</b> %{x|%H:%M} - "
-                "%{x|%Y/%m/%d} - "
-                "%{x|%a}<br><br>"
-                "<b>Counts:</b> %{y}<br>"
-            )
-            first_trace = False
-        else:
-            hovertemplate = (
-                        "<b>Counts:</b> %{y}<br>"
-                    )
+        names.append(item.database + "(" + item.operation_type + ")")
+        stacked.append((x_item, counts.astype(np.float32)))
 
-        unique_id = item.database + "(" + item.operation_type + ")"
+    # Layers are downsampled together so the stacked total keeps its peaks
+    for i, (unique_id, (x_plot, y_plot)) in enumerate(zip(names, downsample_stacked(stacked))):
         fig.add_trace(
             go.Scatter(
-                x=item.psql_statements_executed_count.timestamps(),
-                y=item.psql_statements_executed_count.data(),
+                x=x_plot,
+                y=y_plot,
                 name=unique_id,
                 mode="lines",
                 # line=dict(color=CONNECTION_STATE_COLORS[item.state]),
                 stackgroup="one",
                 legendgroup=unique_id,
-                hovertemplate=hovertemplate,
+                hovertemplate=_HOVER_FIRST if i == 0 else _HOVER_REST,
                 showlegend=True,
                 visible=True,
+                _validate=False,
             ),
         )
 
-        fig.update_xaxes(
-            tickformat="%H:%M<br>%Y/%m/%d<br>%a",
-        )
+    fig.update_xaxes(
+        tickformat="%H:%M<br>%Y/%m/%d<br>%a",
+    )
 
-        fig.update_yaxes(
-            title_text="Counts",
-        )
-        fig.update_layout(
-            hovermode="x",  # <- one hover box containing ALL traces at that x
-            hoverdistance=-1,
-            # hoverdistance=50,  # optional: how far from the cursor Plotly will look for points
-        )
-        fig.update_layout(
-            height=400,
-            margin=dict(l=20, r=20, t=60, b=150),
-            legend=dict(
-                orientation="h",
-                xanchor="left",
-                x=0.0,
-                yanchor="top",
-                y=-0.25
-            ))
+    fig.update_yaxes(
+        title_text="Counts",
+    )
+    fig.update_layout(
+        hovermode="x",  # <- one hover box containing ALL traces at that x
+        hoverdistance=-1,
+        # hoverdistance=50,  # optional: how far from the cursor Plotly will look for points
+    )
+    fig.update_layout(
+        height=400,
+        margin=dict(l=20, r=20, t=60, b=150),
+        legend=dict(
+            orientation="h",
+            xanchor="left",
+            x=0.0,
+            yanchor="top",
+            y=-0.25
+        ))
     return fig
\ No newline at end of file
@@ -18,6 +18,13 @@ try:
 except Exception as e:  # pragma: no cover
     get_plotlyjs = None  # type: ignore
 
+try:
+    # Serialize figure fragments with orjson instead of the pure-Python PlotlyJSONEncoder
+    import plotly.io as pio
+    pio.json.config.default_engine = "orjson"
+except Exception as e:  # pragma: no cover
+    pass
+
 
 mother_dir = os.path.dirname(os.path.abspath(__file__))
 html_template_path = os.path.join(mother_dir, "figure_logic", "hotspots_report_template.html")
@@ -219,9 +226,13 @@ class HotspotsReport:
 
 
 def _to_json(obj: Any) -> str:
-    # tiny local helper to avoid requiring extra deps
-    import json
-    return json.dumps(obj, ensure_ascii=False)
+    # tiny local helper; orjson when available, stdlib otherwise
+    try:
+        import orjson
+    except ImportError:  # pragma: no cover
+        import json
+        return json.dumps(obj, ensure_ascii=False)
+    return orjson.dumps(obj).decode("utf-8")
 
 _NOTE_LINK_RE = re.compile(r'^\s*\[\[(?P<label>[^|\]]+)\|(?P<file>[^\]]+)\]\]\s*$')
 
@@ -8,7 +8,6 @@ import questionary
 from datetime import datetime, timezone, timedelta
 
 import config as config
-from entry import analysis_entry
 from utils import ensure_adc_login, load_db_secret_list, parse_utc_minute
 
 CONTEXT_SETTINGS = dict(help_option_names=['-h', '--help'])
@@ -58,6 +57,8 @@ def generate(project_id, instance_id, output_dir, start_time, end_time, duration
         )
 
     duration_hours = duration_hours if duration_hours is not None else 0
+    # entry pulls in the collectors and Google client libraries; only load them once a report is generated
+    from entry import analysis_entry
     analysis_entry(project_id, instance_id, output_dir, start_time, end_time, duration_hours)
     pass
 
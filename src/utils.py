@@ -1,15 +1,39 @@
+import os
 import shutil
+import sys
+from bisect import bisect_right
 from pathlib import Path
-from typing import Optional
-from datetime import datetime, timezone
+from types import MappingProxyType
+from typing import Any, Dict, List, Optional, Tuple
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from itertools import islice
+from operator import itemgetter
 import json
+import mmap
 import subprocess
 import click
+import numpy as np
 import logging
-import google.auth
-from google.auth.exceptions import DefaultCredentialsError
 import config
 
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:  # pragma: no cover
+    orjson = None
+    _json_loads = json.loads  # also accepts UTF-8 bytes
+
+
+# Reciprocals of the unit sizes; powers of two, so multiplying is exact
+_UNIT_SCALE = {
+    "b": 1.0,
+    "bytes": 1.0,
+    "mib": 1.0 / 1024.0 ** 2,
+    "gib": 1.0 / 1024.0 ** 3,
+}
+_GIB_SCALE = _UNIT_SCALE["gib"]
+
 
 def bytes_to_unit(value_bytes: float, unit: str = "GiB") -> float:
     """
@@ -18,21 +42,177 @@ def bytes_to_unit(value_bytes: float, unit: str = "GiB") -> float:
     Notes
     -----
     - Returns 0.0 for None to keep Plotly traces and sunbursts stable.
+    - Unknown units fall back to returning bytes unchanged.
     """
     if value_bytes is None:
         return 0.0
+    return float(value_bytes) * _UNIT_SCALE.get(unit.lower(), 1.0)
+
+
+def bytes_to_gib(value_bytes: float) -> float:
+    """Fixed-unit bytes_to_unit(value_bytes, "GiB") without the unit lookup."""
+    if value_bytes is None:
+        return 0.0
+    return float(value_bytes) * _GIB_SCALE
+
+
+# Below this size the plain NumPy path beats importing numba and compiling the kernel
+_NUMBA_MIN_SIZE = 1_000_000
+
+
+@lru_cache(maxsize=1)
+def _numba_scale_nan_to_zero():
+    """
+    Optional: JIT the bytes conversion for very long series.
+
+    numba is imported and the kernel built on first use only, so importing utils (and every CLI call) stays cheap.
+    Returns None when numba is not installed.
+    """
+    try:
+        from numba import njit, prange
+    except ImportError:
+        return None
+
+    # fastmath without "nnan": the NaN check below must not be optimised away
+    @njit(parallel=True, fastmath={"ninf", "nsz", "arcp", "contract", "afn", "reassoc"}, cache=True)
+    def _scale_nan_to_zero(a, inv):
+        out = np.empty_like(a)
+        for i in prange(a.size):
+            v = a[i]
+            out[i] = 0.0 if v != v else v * inv
+        return out
+
+    return _scale_nan_to_zero
+
+
+def bytes_to_unit_array(values, unit: str = "GiB", dtype=np.float64) -> np.ndarray:
+    """
+    Vectorized bytes_to_unit: convert a sequence of raw bytes to the requested unit.
+
+    Notes
+    -----
+    - None/NaN entries become 0.0, matching bytes_to_unit.
+    - Pass dtype=np.float32 for plot-only data to halve the encoded trace size.
+    """
+    scale = _UNIT_SCALE.get(unit.lower(), 1.0)
+    arr = np.array(values, dtype=dtype)
+    if arr.size >= _NUMBA_MIN_SIZE:
+        kernel = _numba_scale_nan_to_zero()
+        if kernel is not None:
+            return kernel(arr, arr.dtype.type(scale))
+
+    np.nan_to_num(arr, copy=False)
+    arr *= scale
+    return arr
+
+
+def _bucket_peak_indices(y: np.ndarray, step: int) -> np.ndarray:
+    """Index of the largest value in each `step`-sized bucket of y (NaN never wins unless the bucket is all NaN)."""
+    n = y.size
+    buckets = -(-n // step)
+    padded = np.full(buckets * step, -np.inf, dtype=y.dtype)
+    padded[:n] = y
+    padded[np.isnan(padded)] = -np.inf
+    return np.arange(0, n, step) + padded.reshape(buckets, step).argmax(axis=1)
+
+
+def downsample_xy(x, y, max_points: Optional[int] = None):
+    """
+    Reduce a dense series to at most `max_points` points for plotting.
+
+    Notes
+    -----
+    - Keeps the peak of each fixed-size bucket, at the peak's own timestamp, so spikes stay visible.
+    - Not for stackgroup traces; use downsample_stacked so all layers are sampled together.
+    - Float ndarrays keep their dtype; anything else becomes float64.
+    - Returns (x, y) unchanged when the series is already small enough.
+    """
+    if max_points is None:
+        max_points = config.MAX_TRACE_POINTS
+
+    n = len(y)
+    if n <= max_points:
+        return x, y
+
+    y_arr = np.asarray(y)
+    if y_arr.dtype.kind != "f":
+        y_arr = y_arr.astype(np.float64)
+
+    idx = _bucket_peak_indices(y_arr, -(-n // max_points))
+    return [x[i] for i in idx.tolist()], y_arr[idx]
+
+
+def downsample_stacked(series: List[Tuple[List[datetime], np.ndarray]], max_points: Optional[int] = None):
+    """
+    Downsample the traces of one stackgroup together.
+
+    Notes
+    -----
+    - Buckets the union of all timestamps and keeps, per bucket, the timestamp where the stacked total peaks.
+    - Every trace is cut to those same timestamps, so the plotted total is a real total and spikes stay visible.
+    - Returns the series unchanged when the union is already small enough.
+    """
+    if max_points is None:
+        max_points = config.MAX_TRACE_POINTS
 
-    unit = unit.lower()
+    timeline = sorted(set().union(*(x for x, _ in series)))
+    n = len(timeline)
+    if n <= max_points:
+        return series
 
-    if unit in ("b", "bytes"):
-        return float(value_bytes)
-    if unit == "mib":
-        return float(value_bytes) / (1024.0 ** 2)
-    if unit == "gib":
-        return float(value_bytes) / (1024.0 ** 3)
+    pos = {t: i for i, t in enumerate(timeline)}
+    total = np.zeros(n, dtype=np.float64)
+    for x, y in series:
+        np.add.at(total, [pos[t] for t in x], np.nan_to_num(np.asarray(y, dtype=np.float64)))
 
-    # Safe fallback: return bytes unchanged
-    return float(value_bytes)
+    keep = {timeline[i] for i in _bucket_peak_indices(total, -(-n // max_points)).tolist()}
+
+    out = []
+    for x, y in series:
+        mask = np.fromiter((t in keep for t in x), dtype=bool, count=len(x))
+        out.append(([t for t, m in zip(x, mask) if m], np.asarray(y)[mask]))
+    return out
+
+
+# id(ts) -> (ts, x, y); holding ts keeps its id from being reused while cached
+_TS_CACHE: Dict[int, Tuple[Any, List[datetime], np.ndarray]] = {}
+
+
+def ts_xy(ts) -> Tuple[List[datetime], np.ndarray]:
+    """
+    Return (x, y) sorted by time from a TimeSeries, memoized for the current report run.
+
+    Notes
+    -----
+    - y is a float64 ndarray; None values become NaN.
+    - Series must not be mutated once read through here. Call clear_ts_cache() after the report is written.
+    """
+    entry = _TS_CACHE.get(id(ts))
+    if entry is None:
+        # Timsort is linear on the already-ordered points collectors usually emit
+        vals = sorted(ts.values, key=itemgetter(0))
+        x = [t for t, _ in vals]
+        y = np.array([v for _, v in vals], dtype=np.float64)
+
+        entry = (ts, x, y)
+        _TS_CACHE[id(ts)] = entry
+    return entry[1], entry[2]
+
+
+def clear_ts_cache() -> None:
+    _TS_CACHE.clear()
+
+
+@lru_cache(maxsize=1)
+def _cached_adc():
+    """google.auth.default(), memoized on success (failures are not cached)."""
+    import google.auth
+    return google.auth.default()
+
+
+@lru_cache(maxsize=1)
+def _find_gcloud() -> Optional[str]:
+    return shutil.which("gcloud") or shutil.which("gcloud.cmd")
 
 
 def ensure_adc_login():
@@ -40,8 +220,17 @@ def ensure_adc_login():
     Ensures Google Application Default Credentials (ADC) are available.
     Runs `gcloud auth application-default login` only if needed.
     """
+    # An explicit key file is authoritative; no need to probe ADC or gcloud
+    creds_file = os.environ.get("GOOGLE_APPLICATION_CREDENTIALS")
+    if creds_file and Path(creds_file).is_file():
+        logging.info(f'Using credentials from GOOGLE_APPLICATION_CREDENTIALS: {creds_file}')
+        return True
+
+    # google.auth pulls in a large import tree; only load it once ADC actually has to be checked
+    from google.auth.exceptions import DefaultCredentialsError
+
     try:
-        credentials, project = google.auth.default()
+        credentials, project = _cached_adc()
         logging.info('Application Default Credentials already configured.')
         if project:
             logging.info(f'Project: {project}')
@@ -50,7 +239,13 @@ def ensure_adc_login():
     except DefaultCredentialsError:
         logging.info('ADC not found. Launching gcloud login...')
 
-        gcloud = shutil.which("gcloud") or shutil.which("gcloud.cmd")
+        # The login flow waits on a browser/prompt; fail fast instead of hanging in CI
+        if not sys.stdin.isatty():
+            logging.error('ADC not found and no interactive terminal for gcloud login')
+            raise RuntimeError(
+                "ADC not found: run `gcloud auth application-default login` or set GOOGLE_APPLICATION_CREDENTIALS")
+
+        gcloud = _find_gcloud()
         if not gcloud:
             logging.error(f'gcloud command not found')
             raise RuntimeError(
@@ -64,58 +259,85 @@ def ensure_adc_login():
         except Exception as e:
             logging.error(e)
             return False
+        # Fresh credentials were written; let the next lookup see them
+        _cached_adc.cache_clear()
         logging.info("ADC login successful.")
         return True
 
 
+_LOG_TS_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+_CLOUDSQL_LOG_FILTER = '''
+    resource.type="cloudsql_database"
+    timestamp>="{start}"
+    timestamp<="{end}"
+    '''
+
+
+@lru_cache(maxsize=4)
+def _get_logging_client(project_id: str):
+    """Create one Cloud Logging client per project and reuse it for the process lifetime."""
+    from google.cloud import logging_v2
+    return logging_v2.Client(project=project_id)
+
+
 # Todo: that means your Monitoring API auth + project are correct, and Cloud SQL metrics are visible.
 def check_project_endpoints():
-    from datetime import datetime, timedelta, timezone
     from google.cloud import logging_v2
 
     PROJECT_ID = "psql-hotspots"
-    client = logging_v2.Client(project=PROJECT_ID)
+    MAX_ENTRIES = 5
+    client = _get_logging_client(PROJECT_ID)
 
     end = datetime.now(timezone.utc)
     start = end - timedelta(hours=1)
 
-    start_s = start.isoformat().replace("+00:00", "Z")
-    end_s = end.isoformat().replace("+00:00", "Z")
+    log_filter = _CLOUDSQL_LOG_FILTER.format(
+        start=start.strftime(_LOG_TS_FORMAT),
+        end=end.strftime(_LOG_TS_FORMAT),
+    )
 
-    log_filter = f'''
-    resource.type="cloudsql_database"
-    timestamp>="{start_s}"
-    timestamp<="{end_s}"
-    '''
-
-    it = client.list_entries(filter_=log_filter, order_by=logging_v2.DESCENDING, page_size=50)
+    # Only MAX_ENTRIES are printed, so fetch a single page of that size and stop there
+    it = islice(
+        client.list_entries(filter_=log_filter, order_by=logging_v2.DESCENDING, page_size=MAX_ENTRIES),
+        MAX_ENTRIES,
+    )
 
-    found = 0
+    found = False
     for entry in it:
-        found += 1
+        found = True
         # Print raw-ish content to see where text lives
         print("logName:", entry.log_name)
         print("labels:", dict(entry.resource.labels))
         print("payload type:", type(entry.payload))
         print("payload:", entry.payload)
         print("----")
-        if found >= 5:
-            break
 
-    if found == 0:
+    if not found:
         print(
             "No Cloud SQL log entries found in this project/time window (wrong project, no permissions, or logs not in this project).")
 
 
+# Above this size parse straight from a memory map instead of copying the file into bytes first
+_SECRETS_MMAP_MIN_BYTES = 1 << 20
+
+
+def _load_json_file(path: Path, size: int):
+    if orjson is None or size <= _SECRETS_MMAP_MIN_BYTES:
+        return _json_loads(path.read_bytes())
+
+    with path.open("rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        with memoryview(mm) as buf:
+            return orjson.loads(buf)
+
+
 def load_db_secret_list(path: str) -> list[dict]:
     path = Path(path)
     if not path.exists():
         path.parent.mkdir(parents=True, exist_ok=True)
-        path.write_text("[]", encoding="utf-8")
+        path.write_bytes(b"[]")
         return []
 
-    with path.open("r", encoding="utf-8") as f:
-        return json.load(f)
+    return _load_json_file(path, path.stat().st_size)
 
 
 def parse_utc_minute(value: Optional[str]) -> Optional[datetime]:
@@ -130,48 +352,101 @@ def parse_utc_minute(value: Optional[str]) -> Optional[datetime]:
     if s.endswith("Z"):
         s = s[:-1]
 
+    # Fixed-width slicing instead of strptime, which re-parses its format on every call
     try:
-        dt = datetime.strptime(s, "%Y-%m-%dT%H:%M")
-    except ValueError as e:
+        digits = s[0:4] + s[5:7] + s[8:10] + s[11:13] + s[14:]
+        if len(s) != 16 or s[4] + s[7] + s[10] + s[13] != "--T:" or not digits.isdigit():
+            raise ValueError(s)
+        return datetime(int(s[0:4]), int(s[5:7]), int(s[8:10]), int(s[11:13]), int(s[14:16]), tzinfo=timezone.utc)
+    except (ValueError, IndexError) as e:
         raise click.BadParameter(
             "Invalid datetime. Use UTC format: YYYY-MM-DDTHH:MM (no seconds), "
             "e.g. 2026-01-29T10:15"
         ) from e
 
-    return dt.replace(tzinfo=timezone.utc)
-
 
 def write_table_txt(columns: list[str], rows: list[dict], filename: str) -> None:
-    # Determine column widths (max of header vs values)
-    widths = {}
-    for col in columns:
-        max_len = len(col)
-        for row in rows:
-            val = str(row.get(col, "")) if row.get(col) is not None else ""
-            max_len = max(max_len, len(val))
-        widths[col] = max_len
-
-    def format_row(values):
-        return " | ".join(f"{v:<{widths[c]}}" for v, c in zip(values, columns))
+    # Fetch all cells of a row in one itemgetter call; rows missing a column take the slow path
+    if len(columns) == 1:
+        col = columns[0]
+        get_cells = lambda row: (row[col],)
+    elif columns:
+        get_cells = itemgetter(*columns)
+    else:
+        get_cells = lambda row: ()
 
-    file_path = config.OUTPUT_DIR_PATH / filename
+    # Stringify every cell once
+    str_rows = []
+    for row in rows:
+        try:
+            raw = get_cells(row)
+        except KeyError:
+            raw = [row.get(col) for col in columns]
+        str_rows.append(["" if val is None else str(val) for val in raw])
+
+    # Determine column widths (max of header vs values), scanning one column at a time
+    widths = {col: len(col) for col in columns}
+    for col, cells in zip(columns, zip(*str_rows)):
+        widths[col] = max(widths[col], max(map(len, cells)))
 
-    with open(file_path, "w", encoding="utf-8") as f:
-        # Header
-        f.write(format_row(columns) + "\n")
+    # One left-aligned template for every line
+    fmt = " | ".join("{:<" + str(widths[col]) + "}" for col in columns)
 
-        # Separator
-        f.write(
-            " | ".join("-" * widths[col] for col in columns) + "\n"
-        )
+    # Header + Separator
+    lines = [
+        fmt.format(*columns) + "\n",
+        " | ".join("-" * widths[col] for col in columns) + "\n",
+    ]
 
-        # Rows
-        for row in rows:
-            values = [str(row.get(col, "")) if row.get(col) is not None else "" for col in columns]
-            f.write(format_row(values) + "\n")
+    # Rows
+    lines.extend(fmt.format(*values) + "\n" for values in str_rows)
 
+    file_path = config.OUTPUT_DIR_PATH / filename
 
-def get_disk_iops_tp(tier_str: str, availability: str) -> dict:
+    with open(file_path, "w", encoding="utf-8", buffering=65536) as f:
+        f.writelines(lines)
+
+# Shared-core tiers have a fixed disk profile regardless of vCPU count
+_SHARED_CORE_TIERS = ("db-f1-micro", "db-g1-small")
+_SHARED_CORE_PERF = {
+    "ZONAL": {"iops": (15000, 15000), "tp": (200, 200)},
+    "REGIONAL": {"iops": (15000, 15000), "tp": (200, 100)},
+}
+
+# Performance Mapping Table
+# Keys represent the start of the vCPU range
+_VCPU_BUCKETS = (1, 2, 8, 16, 32, 64)
+_DISK_PERF = {
+    (1, "ZONAL"): {"iops": (15000, 15000), "tp": (200, 200)},
+    (1, "REGIONAL"): {"iops": (15000, 15000), "tp": (200, 100)},
+    (2, "ZONAL"): {"iops": (15000, 15000), "tp": (240, 240)},
+    (2, "REGIONAL"): {"iops": (15000, 15000), "tp": (240, 120)},
+    (8, "ZONAL"): {"iops": (15000, 15000), "tp": (800, 800)},
+    (8, "REGIONAL"): {"iops": (15000, 15000), "tp": (800, 400)},
+    (16, "ZONAL"): {"iops": (25000, 25000), "tp": (1200, 1200)},
+    (16, "REGIONAL"): {"iops": (25000, 25000), "tp": (1200, 600)},
+    (32, "ZONAL"): {"iops": (60000, 60000), "tp": (1200, 1200)},
+    (32, "REGIONAL"): {"iops": (60000, 60000), "tp": (1200, 600)},
+    (64, "ZONAL"): {"iops": (100000, 100000), "tp": (1200, 1200)},
+    (64, "REGIONAL"): {"iops": (100000, 80000), "tp": (1200, 1000)},
+}
+
+
+def _perf_result(perf: dict) -> MappingProxyType:
+    return MappingProxyType({
+        "max_iops_rw": perf.get("iops"),
+        "max_throughput_rw": perf.get("tp")
+    })
+
+
+# Results are built once and shared by every call
+_SHARED_CORE_RESULT = {avail: _perf_result(perf) for avail, perf in _SHARED_CORE_PERF.items()}
+_DISK_PERF_RESULT = {key: _perf_result(perf) for key, perf in _DISK_PERF.items()}
+_UNKNOWN_PERF_RESULT = _perf_result({})
+
+
+@lru_cache(maxsize=256)
+def get_disk_iops_tp(tier_str: str, availability: str) -> MappingProxyType:
     """
     Parses a Cloud SQL tier string and maps it to performance metrics.
 
@@ -180,80 +455,19 @@ def get_disk_iops_tp(tier_str: str, availability: str) -> dict:
         availability (str): "REGIONAL" or "ZONAL"
 
     Returns:
-        dict: The mapped IOPS and throughput values.
+        MappingProxyType: The mapped IOPS and throughput values.
+              Results are cached per (tier, availability), so they are read-only.
     """
-    if tier_str == "db-f1-micro" or "db-g1-small":
-        if availability == "REGIONAL":
-            return {
-                "max_iops_rw": (15000, 15000),
-                "max_throughput_rw": (200, 100)
-            }
-        else:
-            return {
-                "max_iops_rw": (15000, 15000),
-                "max_throughput_rw": (200, 200)
-            }
-
-    parts = tier_str.split("-")
-
-
-    cpu_count = int(parts[-2])
-
-    # Extract prefix info for the mapping key: (db, custom, availability)
-    # parts[0] is 'db', parts[1] is 'custom'
-    mapping_key = (parts[0], parts[1], availability.upper())
-
-    # 2. Performance Mapping Table
-    # Keys represent the start of the vCPU range
-    perf_map = {
-        1: {
-            "ZONAL": {"iops": (15000, 15000), "tp": (200, 200)},
-            "REGIONAL": {"iops": (15000, 15000), "tp": (200, 100)}
-        },
-        2: {
-            "ZONAL": {"iops": (15000, 15000), "tp": (240, 240)},
-            "REGIONAL": {"iops": (15000, 15000), "tp": (240, 120)}
-        },
-        8: {
-            "ZONAL": {"iops": (15000, 15000), "tp": (800, 800)},
-            "REGIONAL": {"iops": (15000, 15000), "tp": (800, 400)}
-        },
-        16: {
-            "ZONAL": {"iops": (25000, 25000), "tp": (1200, 1200)},
-            "REGIONAL": {"iops": (25000, 25000), "tp": (1200, 600)}
-        },
-        32: {
-            "ZONAL": {"iops": (60000, 60000), "tp": (1200, 1200)},
-            "REGIONAL": {"iops": (60000, 60000), "tp": (1200, 600)}
-        },
-        64: {
-            "ZONAL": {"iops": (100000, 100000), "tp": (1200, 1200)},
-            "REGIONAL": {"iops": (100000, 80000), "tp": (1200, 1000)}
-        }
-    }
-
-    # 3. Logic to find the correct vCPU bucket
-    if cpu_count >= 64:
-        bucket = 64
-    elif cpu_count >= 32:
-        bucket = 32
-    elif cpu_count >= 16:
-        bucket = 16
-    elif cpu_count >= 8:
-        bucket = 8
-    elif cpu_count >= 2:
-        bucket = 2
-    else:
-        bucket = 1
+    availability = availability.upper()
+
+    if tier_str in _SHARED_CORE_TIERS:
+        return _SHARED_CORE_RESULT["REGIONAL" if availability == "REGIONAL" else "ZONAL"]
 
-    # Fetch the results based on the bucket and availability
-    res = perf_map[bucket].get(availability.upper(), {})
+    cpu_count = int(tier_str.rsplit("-", 2)[-2])
 
-    # Return as a nested dict including the requested tuple-key structure
-    return {
-        "max_iops_rw": res.get("iops"),
-        "max_throughput_rw": res.get("throughput")
-    }
+    # Largest bucket start <= cpu_count; anything below 1 vCPU falls into the first bucket
+    bucket = _VCPU_BUCKETS[max(bisect_right(_VCPU_BUCKETS, cpu_count) - 1, 0)]
+    return _DISK_PERF_RESULT.get((bucket, availability), _UNKNOWN_PERF_RESULT)
 
 
 # --- Example Usage ---